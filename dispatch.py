@@ -6,75 +6,173 @@ Simple dispatcher script that
     - End-of-run ASCII table summarizing results and per-task durations with colors.
 """
 
-import json
 import logging
+import mmap
+import os
+import queue
+import sys
 import time
+import orjson
+from logging.handlers import QueueHandler, QueueListener
 from tqdm import tqdm
-from pathlib import Path
-from celery_app import task_a, task_b
+from celery import group, states
+from celery.exceptions import TimeoutError as CeleryTimeoutError
+from celery_app import app, compressed_signature, task_a, task_b
 from colorama import init, Fore, Style, Back
 
 # Initialize colorama for cross-platform color support
 init(autoreset=True)
 
 # Prepare log folder and file for storing JSON results
-log_dir = Path(__file__).parent / "logs"
-log_dir.mkdir(exist_ok=True)  # Create 'logs' folder if missing
+# (plain absolute str paths; mkdir only runs when the folder is missing)
+log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+if not os.path.isdir(log_dir):
+    os.makedirs(log_dir, exist_ok=True)  # Create 'logs' folder if missing
 timestamp = time.strftime("%Y%m%d_%H%M%S")
-log_file = log_dir / f"log_{timestamp}.json"
+log_file = os.path.join(log_dir, f"log_{timestamp}.json")
 
-# Logger setup for console 
+class TqdmHandler(logging.StreamHandler):
+    """
+    Console handler that writes via tqdm.write, clearing and redrawing any active progress bar.
+    """
+    def emit(self, record):
+        try:
+            tqdm.write(self.format(record), file=self.stream)
+        except Exception:
+            self.handleError(record)
+
+class MmapFileHandler(logging.Handler):
+    """
+    File handler that appends records into a preallocated mmap region and trims the unused tail on close.
+
+    The region starts small and doubles as it fills. An unclean exit (SIGKILL/SIGTERM) skips close(),
+    leaving up to one region of NUL padding after the last record; reopening the file trims it.
+    """
+    def __init__(self, filename, size=64 << 10, encoding="utf-8"):
+        super().__init__()
+        self.filename = filename
+        self.size = size
+        self.encoding = encoding
+        self.fd = None
+        self.mm = None
+        self.offset = 0
+
+    def _map(self, length):
+        """(Re)size the file to length bytes and map all of it."""
+        if self.mm is not None:
+            self.mm.close()
+        os.ftruncate(self.fd, length)
+        self.mm = mmap.mmap(self.fd, length)
+
+    def emit(self, record):
+        # handle() already holds self.lock, so offset updates are serialized
+        try:
+            data = (self.format(record) + "\n").encode(self.encoding)
+            if self.mm is None:
+                # Opened lazily like FileHandler(delay=True); append after any existing content
+                self.fd = os.open(self.filename, os.O_RDWR | os.O_CREAT, 0o644)
+                existing = os.fstat(self.fd).st_size
+                self._map(max(existing, self.size))
+                # Drop a NUL tail left by an unclean exit, along with any partial record before it
+                nul = self.mm.find(b"\0", 0, existing)
+                self.offset = existing if nul == -1 else self.mm.rfind(b"\n", 0, nul) + 1
+            end = self.offset + len(data)
+            if end > len(self.mm):
+                self._map(max(end, 2 * len(self.mm)))
+            self.mm[self.offset:end] = data
+            self.offset = end
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        self.acquire()
+        try:
+            if self.mm is not None:
+                self.mm.close()
+                os.ftruncate(self.fd, self.offset)
+                os.close(self.fd)
+                self.mm = self.fd = None
+        finally:
+            self.release()
+            super().close()
+
+# Logger setup for console and file. The dispatcher only enqueues records;
+# a background listener thread does the actual console and file I/O.
 logger = logging.getLogger("task_logger")
 logger.setLevel(logging.INFO)
-handler = logging.StreamHandler()
-handler.setFormatter(logging.Formatter('%(message)s'))
-logger.addHandler(handler)
+formatter = logging.Formatter('%(message)s')
+# On a terminal, write through tqdm so log lines don't corrupt the progress bar
+console_handler = TqdmHandler() if sys.stderr.isatty() else logging.StreamHandler()
+console_handler.setFormatter(formatter)
+# mmap-backed appends; Windows can't grow a mapped file in place, so use a plain FileHandler there
+if os.name == "nt":
+    file_handler = logging.FileHandler(log_file, encoding="utf-8", delay=True)
+else:
+    file_handler = MmapFileHandler(log_file)
+file_handler.setFormatter(formatter)
+log_queue = queue.Queue(-1)
+logger.addHandler(QueueHandler(log_queue))
+# Started and stopped by main() so every run drains its records, even on error
+listener = QueueListener(log_queue, console_handler, file_handler)
 
 def log_json(event: str, **kwargs):
     """
     Logs plain JSON to console and saves the same to a timestamped file.
     """
     entry = {"event": event, "details": kwargs}
-    line = json.dumps(entry, ensure_ascii=False)
+    line = orjson.dumps(entry).decode()
 
-    # Console
+    # Console and file, written by the background listener
     logger.info(line)
 
-    # File
-    with open(log_file, "a", encoding="utf-8") as f:
-        f.write(line + "\n")
+# Color codes resolved once, so table rendering doesn't look them up per row
+GREEN = Fore.GREEN
+RED = Fore.RED
+MAGENTA = Fore.MAGENTA
+YELLOW = Fore.YELLOW
+CYAN = Fore.CYAN
+WHITE = Fore.WHITE
+RESET = Style.RESET_ALL
+BRIGHT = Style.BRIGHT
+
+# Status -> color lookups used by the summary table
+STATUS_COLORS = {
+    "success": GREEN,
+    "failure": RED,
+    "timeout": MAGENTA,
+    "unknown": YELLOW,
+    "pending": YELLOW,
+    "running": CYAN
+}
+RESULT_COLORS = {
+    "success": GREEN,
+    "failure": RED,
+    "timeout": RED
+}
 
 def get_status_color(status: str) -> str:
     """
     Returns appropriate color codes for different task statuses.
     """
-    color_map = {
-        "success": Fore.GREEN,
-        "failure": Fore.RED,
-        "timeout": Fore.MAGENTA,
-        "unknown": Fore.YELLOW,
-        "pending": Fore.YELLOW,
-        "running": Fore.CYAN
-    }
-    return color_map.get(status.lower(), Fore.WHITE)
+    return STATUS_COLORS.get(status.lower(), WHITE)
 
 def get_duration_color(duration: float) -> str:
     """
     Returns color based on task duration (green for fast, yellow for medium, red for slow).
     """
     if duration < 1.0:
-        return Fore.GREEN
+        return GREEN
     elif duration < 5.0:
-        return Fore.YELLOW
+        return YELLOW
     else:
-        return Fore.RED
+        return RED
 
 def print_summary_table(results: dict, task_times: dict, statuses: dict):
     """
     Prints a colorized ASCII table with task name, status, duration, and result.
     """
     if not results:
-        print(f"{Fore.YELLOW}No results to display{Style.RESET_ALL}")
+        print(f"{YELLOW}No results to display{RESET}")
         return
 
     # Column widths
@@ -83,6 +181,12 @@ def print_summary_table(results: dict, task_times: dict, statuses: dict):
     time_w = max(len("time_s"), 6) + 2
     result_w = 60  # cap result text width
 
+    # Row template with column widths and fixed colors baked in once per table
+    row_tmpl = (f"{CYAN}{{task:<{name_w}}}{RESET}"
+                f"{{status_color}}{{status:<{status_w}}}{RESET}"
+                f"{{duration_color}}{{duration:<{time_w}}}{RESET}"
+                f"{{result_color}}{{result}}{RESET}")
+
     def colored_row(task, status, duration, result):
         """Create a colored row for the table."""
         result_str = str(result)
@@ -90,27 +194,17 @@ def print_summary_table(results: dict, task_times: dict, statuses: dict):
         if len(result_str) > result_w:
             result_str = result_str[:result_w - 3] + "..."
 
-        # Apply colors
-        status_color = get_status_color(status)
-        duration_color = get_duration_color(duration)
-
-        # Color the result based on status
-        if status.lower() == "success":
-            result_color = Fore.GREEN
-        elif status.lower() in ["failure", "timeout"]:
-            result_color = Fore.RED
-        else:
-            result_color = Fore.WHITE
-
-        return (f"{Fore.CYAN}{task:<{name_w}}{Style.RESET_ALL}"
-                f"{status_color}{status:<{status_w}}{Style.RESET_ALL}"
-                f"{duration_color}{duration:<{time_w}}{Style.RESET_ALL}"
-                f"{result_color}{result_str}{Style.RESET_ALL}")
+        # Color the status and result by status, the duration by how long it took
+        status_key = status.lower()
+        return row_tmpl.format(task=task, status=status, duration=duration, result=result_str,
+                               status_color=STATUS_COLORS.get(status_key, WHITE),
+                               duration_color=get_duration_color(duration),
+                               result_color=RESULT_COLORS.get(status_key, WHITE))
 
     # Header with styling
-    header = (f"{Style.BRIGHT}{Fore.WHITE}{'task':<{name_w}}"
-              f"{'status':<{status_w}}{'time_s':<{time_w}}result{Style.RESET_ALL}")
-    separator = f"{Fore.MAGENTA}{'-' * (name_w + status_w + time_w + result_w)}{Style.RESET_ALL}"
+    header = (f"{BRIGHT}{WHITE}{'task':<{name_w}}"
+              f"{'status':<{status_w}}{'time_s':<{time_w}}result{RESET}")
+    separator = f"{MAGENTA}{'-' * (name_w + status_w + time_w + result_w)}{RESET}"
 
     print(f"\n{header}")
     print(separator)
@@ -124,22 +218,22 @@ def print_summary_table(results: dict, task_times: dict, statuses: dict):
     # Add a bottom border
     print(separator)
 
-def main():
-    overall_start = time.time()
+def run_dispatch():
+    """
+    Dispatches the tasks, waits for their results and prints the summary.
+    """
+    overall_start = time.monotonic()
     print()
 
     log_json("start", message="Dispatching tasks")
     print(f"\n{Fore.CYAN}{Style.BRIGHT}🚀 Starting task dispatch...{Style.RESET_ALL}\n")
 
-    # Dispatch tasks and record start times
-    start_times = {}
-    tasks = {
-        "task_a": task_a.delay(),
-        "task_b": task_b.delay(),
-    }
-
-    for name in tasks:
-        start_times[name] = time.time()
+    # Dispatch both tasks as one group over a pooled producer and record the start time
+    task_names = ("task_a", "task_b")
+    with app.producer_or_acquire() as producer:
+        group_result = group(compressed_signature(task_a), compressed_signature(task_b)).apply_async(producer=producer)
+    start_time = time.monotonic()
+    tasks = dict(zip(task_names, group_result.results))
 
     total = len(tasks)
     success_count = 0
@@ -152,85 +246,89 @@ def main():
 
     # Progress bar visualization with timeout handling
     TASK_TIMEOUT = 30  # Maximum time to wait for any single task (in seconds)
-    CHECK_INTERVAL = 0.5  # How often to check task status (in seconds)
+
+    # Map task ids back to names; entries are removed as results arrive
+    pending = {result.id: name for name, result in tasks.items()}
 
     with tqdm(total=total, desc="Processing", ncols=80, 
-              bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]') as pbar:
-        completed = 0
-        while completed < total:
-            current_time = time.time()
-
-            for name, result in list(tasks.items()):
-                task_runtime = current_time - start_times[name]
-                # Check if task has completed
-                if result.ready():  # Non-blocking check
-                    end_time = time.time()
-                    duration = round(end_time - start_times[name], 3)
-                    try:
-                        output = result.get(timeout=20)
-                        final_output = output['result']
-                        retry_count = output['retry_count']
-                        status = "success"
-                        success_count += 1
-                    except Exception as e:
-                        output = str(e)
-                        status = "failure"
-
-                    results[name] = final_output
-                    task_times[name] = duration
-                    statuses[name] = status
-
-                    # Log JSON for each completed task
-                    print("\n")
-                    log_data = {
-                        "task": name,
-                        "status": status,
-                        "result": final_output,
-                        "execution_time_s": duration
-                    }
-
-                    if retry_count and retry_count!=0:
-                        log_data["retry"] = retry_count
-
-                    log_json("task_completed", **log_data)
-                    del tasks[name]
-                    completed += 1
-                    pbar.update(1)
-
-                # Check if task has timed out
-                elif task_runtime > TASK_TIMEOUT:
-                    end_time = time.time()
-                    duration = round(end_time - start_times[name], 3)
-
-                    # Try to revoke the task
-                    try:
-                        result.revoke(terminate=True)   # Force kill
-                    except Exception:
-                        pass  # Worker might already be down
-                
-                    status = "timeout"
-                    output = f"Task timed out after {TASK_TIMEOUT}s (worker may be down)"
-
-                    results[name] = output
-                    task_times[name] = duration
-                    statuses[name] = status
-
-                    # Log timeout event
-                    print("\n")
-                    log_json(
-                        "task_timeout",
-                        task=name,
-                        status=status,
-                        result=output,
-                        execution_time_s=duration,
-                        timeout_threshold_s=TASK_TIMEOUT
-                    )
-                    del tasks[name]
-                    completed += 1
-                    pbar.update(1)
-
-            time.sleep(CHECK_INTERVAL)
-    overall_end = time.time()
+              bar_format='{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}{postfix}]') as pbar:
+
+        def on_result(task_id, value):
+            """Record, log and count one task as soon as its result arrives."""
+            nonlocal success_count
+            name = pending.pop(task_id)
+            duration = round(time.monotonic() - start_time, 3)
+            retry_count = None
+            # The result is cached from the backend message, so the state check is local
+            if tasks[name].successful():
+                final_output = value['result']
+                retry_count = value['retry_count']
+                status = "success"
+                success_count += 1
+            else:
+                final_output = str(value)
+                status = "failure"
+
+            results[name] = final_output
+            task_times[name] = duration
+            statuses[name] = status
+
+            # Log JSON for each completed task
+            log_data = {
+                "task": name,
+                "status": status,
+                "result": final_output,
+                "execution_time_s": duration
+            }
+
+            if retry_count and retry_count!=0:
+                log_data["retry"] = retry_count
+
+            log_json("task_completed", **log_data)
+            pbar.update(1)
+            pbar.set_postfix_str(f"{name}={status}")
+
+        def on_state(meta):
+            """Show retries live; called for every state message read off the backend's pub/sub socket."""
+            name = pending.get(meta['task_id'])
+            if name and meta['status'] == states.RETRY:
+                pbar.set_postfix_str(f"{name}=retry")
+
+        try:
+            # One blocking wait on the result backend for the whole group
+            group_result.join_native(timeout=TASK_TIMEOUT, propagate=False,
+                                     callback=on_result, on_message=on_state)
+        except CeleryTimeoutError:
+            # Whatever is still pending has exceeded TASK_TIMEOUT
+            for task_id, name in pending.items():
+                result = tasks[name]
+                duration = round(time.monotonic() - start_time, 3)
+
+                # Try to revoke the task
+                try:
+                    result.revoke(terminate=True)   # Force kill
+                except Exception:
+                    pass  # Worker might already be down
+
+                status = "timeout"
+                output = f"Task timed out after {TASK_TIMEOUT}s (worker may be down)"
+
+                results[name] = output
+                task_times[name] = duration
+                statuses[name] = status
+
+                # Log timeout event
+                log_json(
+                    "task_timeout",
+                    task=name,
+                    status=status,
+                    result=output,
+                    execution_time_s=duration,
+                    timeout_threshold_s=TASK_TIMEOUT
+                )
+                pbar.update(1)
+                pbar.set_postfix_str(f"{name}={status}")
+    overall_end = time.monotonic()
 
     # ASCII table summary with colors
     print(f"\n{Fore.YELLOW}{Style.BRIGHT}📊 EXECUTION SUMMARY{Style.RESET_ALL}")
@@ -258,6 +356,15 @@ def main():
     log_json("summary", total_tasks=total, success_rate=f"{success_rate}%", total_time_s=total_time)
     #log_json("end", message="All tasks completed", total_time_s=total_time)
 
+def main():
+    listener.start()
+    try:
+        run_dispatch()
+    finally:
+        # Drain queued log records to console and file, then trim the log file
+        listener.stop()
+        file_handler.close()
+
     print(f"\n💾 {Fore.MAGENTA}Logs saved to: {log_file}{Style.RESET_ALL}\n")
 
 if __name__ == "__main__":